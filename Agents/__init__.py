@@ -0,0 +1 @@
+"""Agent package: code, email, blog and RAG agents plus shared LLM helpers."""
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from functools import lru_cache
+
+from langchain.chat_models import init_chat_model
+from langchain_community.embeddings import OllamaEmbeddings
+
+# How long Ollama should keep the model (and its KV/prompt cache) resident
+# between calls, so identical prompt prefixes hit the server-side cache.
+KEEP_ALIVE = "30m"
+
+
+class _CrossLoopSemaphore:
+    """
+    Async-usable semaphore backed by a threading semaphore, so one gate
+    bounds in-flight LLM requests process-wide. Each UI call drives its own
+    event loop (asyncio.run / st.write_stream), and an asyncio.Semaphore
+    binds its waiters to a single loop — under contention, acquire and
+    release would run on different loops and lose wakeups. Blocking
+    acquires run in a worker thread so the caller's loop stays free.
+    """
+
+    def __init__(self, value: int):
+        self._sem = threading.BoundedSemaphore(value)
+
+    async def __aenter__(self):
+        # Fast path: a free permit costs no thread hop.
+        if self._sem.acquire(blocking=False):
+            return self
+
+        # Slow path. If this task is cancelled while waiting (e.g. a rerun
+        # closes a streaming generator), __aexit__ never runs but the worker
+        # thread still completes its acquire — so whichever side finishes
+        # second hands the permit back, or the gate shrinks permanently.
+        acquired = False
+        cancelled = False
+        handoff_lock = threading.Lock()
+
+        def _blocking_acquire():
+            nonlocal acquired
+            self._sem.acquire()
+            with handoff_lock:
+                if cancelled:
+                    self._sem.release()
+                else:
+                    acquired = True
+
+        try:
+            await asyncio.to_thread(_blocking_acquire)
+        except BaseException:
+            with handoff_lock:
+                cancelled = True
+                if acquired:
+                    self._sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._sem.release()
+
+
+# Bounds the number of in-flight LLM requests across all agents so concurrent
+# async callers don't oversubscribe the Ollama server.
+LLM_SEMAPHORE = _CrossLoopSemaphore(4)
+
+# Registry of tool objects by name so cached model lookups can be keyed on
+# hashable tool-name tuples instead of the (unhashable) tool objects themselves.
+_TOOL_REGISTRY = {}
+
+
+def register_tools(*tools):
+    """Registers tool objects so they can be referenced by name in get_chat_model."""
+    for t in tools:
+        _TOOL_REGISTRY[t.name] = t
+
+
+@lru_cache(maxsize=8)
+def _get_base_model(model: str, provider: str):
+    """One underlying client per (model, provider); tool bindings wrap this."""
+    return init_chat_model(model, model_provider=provider, keep_alive=KEEP_ALIVE)
+
+
+@lru_cache(maxsize=4)
+def get_embeddings_model(model: str) -> OllamaEmbeddings:
+    """
+    Returns a process-wide cached embeddings client for the given model.
+
+    One instance per model means one underlying HTTP connection pool shared
+    by every caller (document ingest, query embedding, the semantic answer
+    cache), so the TCP setup cost is paid once per process rather than per
+    importing module.
+    """
+    return OllamaEmbeddings(model=model)
+
+
+@lru_cache(maxsize=8)
+def get_chat_model(model: str, provider: str = 'ollama', tools: tuple = ()):
+    """
+    Returns a process-wide cached chat model for the given model/provider.
+
+    Tool-bound variants are RunnableBindings over the same underlying client
+    as the raw model, so tool and non-tool calls share one connection pool
+    and one server-side prompt cache. Tools are passed as a tuple of
+    registered tool names.
+
+    Args:
+        model (str): The model name (e.g., 'qwen3:8b').
+        provider (str): The model provider passed to init_chat_model.
+        tools (tuple): Names of tools (registered via register_tools) to bind.
+
+    Returns:
+        The (optionally tool-bound) chat model instance.
+    """
+    llm = _get_base_model(model, provider)
+    if tools:
+        llm = llm.bind_tools([_TOOL_REGISTRY[name] for name in tools])
+    return llm
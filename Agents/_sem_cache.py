@@ -0,0 +1,127 @@
+import time
+import hashlib
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+class SemanticCache:
+    """
+    Embedding-similarity cache for free-form LLM responses.
+
+    Lookups embed the (normalized) query text and search a small FAISS
+    inner-product index of past queries; a stored answer is returned when the
+    cosine similarity clears the threshold and the entry is within the TTL.
+    One vector compare is much cheaper than a full LLM decode. Degrades to a
+    no-op (always miss) when faiss is not installed.
+
+    get() returns the query vector alongside the answer so a miss can be
+    stored via put(..., vector=...) without paying a second embedding call
+    for the same text. Entries are capped at max_entries; inserts past the
+    cap drop expired and oldest entries and rebuild the flat index.
+    """
+
+    def __init__(self, embed: Callable[[str], list], threshold: float = 0.92, ttl: float = 3600.0,
+                 max_entries: int = 256):
+        self._embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._index = None
+        # Parallel to index rows: (timestamp, namespace, answer) per entry.
+        self._entries = []
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.asarray(self._embed(text), dtype=np.float32)
+        return vector / max(np.linalg.norm(vector), 1e-10)
+
+    def get(self, text: str, namespace: str = '') -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Returns (answer, query_vector) for a semantically equivalent query.
+        The answer is None on a miss; the vector is returned either way so
+        the caller can hand it back to put() instead of re-embedding.
+        """
+        if faiss is None:
+            return None, None
+
+        vector = self._vector(text)
+        if self._index is None or self._index.ntotal == 0:
+            return None, vector
+
+        top_k = min(8, self._index.ntotal)
+        scores, ids = self._index.search(vector.reshape(1, -1), top_k)
+
+        now = time.time()
+        for score, i in zip(scores[0], ids[0]):
+            if i < 0 or score < self.threshold:
+                continue
+            timestamp, entry_namespace, answer = self._entries[i]
+            if entry_namespace == namespace and now - timestamp <= self.ttl:
+                return answer, vector
+        return None, vector
+
+    def put(self, text: str, answer: str, namespace: str = '', vector: Optional[np.ndarray] = None) -> None:
+        """Stores an answer under the embedding of its query text.
+
+        Pass the vector returned by get() to skip re-embedding the text.
+        """
+        if faiss is None:
+            return
+        if vector is None:
+            vector = self._vector(text)
+        if self._index is None:
+            self._index = faiss.IndexFlatIP(vector.shape[0])
+        elif len(self._entries) >= self.max_entries:
+            self._compact(time.time())
+        self._index.add(vector.reshape(1, -1))
+        self._entries.append((time.time(), namespace, answer))
+
+    def _compact(self, now: float) -> None:
+        """Drops expired entries (and the oldest beyond the cap) and rebuilds the index."""
+        vectors = self._index.reconstruct_n(0, self._index.ntotal)
+        keep = [i for i, (timestamp, _, _) in enumerate(self._entries) if now - timestamp <= self.ttl]
+        # Entries are appended chronologically, so trimming the front of the
+        # survivors drops the oldest first.
+        overflow = len(keep) - self.max_entries + 1
+        if overflow > 0:
+            keep = keep[overflow:]
+        self._entries = [self._entries[i] for i in keep]
+        self._index = faiss.IndexFlatIP(vectors.shape[1])
+        if keep:
+            self._index.add(vectors[keep])
+
+
+class ExactCache:
+    """
+    sha256-keyed TTL cache for responses whose inputs do not paraphrase
+    (e.g., email bodies), where an exact match is the right cache policy.
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._entries = {}
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8', errors='replace'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        timestamp, value = entry
+        if time.time() - timestamp > self.ttl:
+            del self._entries[key]
+            return None
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._entries[key] = (time.time(), value)
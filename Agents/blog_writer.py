@@ -1,38 +1,41 @@
 import os
 import json
+import heapq
+import functools
 from typing import TypedDict, Optional
 
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, START, END
 
+from Agents._llm_cache import get_chat_model, register_tools, LLM_SEMAPHORE
+
 load_dotenv()
 
 BLOGGER_USERNAME = os.getenv("BLOGGER_USERNAME")
 BLOGGER_API_KEY = os.getenv("BLOGGER_API_KEY")
 
 CHAT_MODEL = os.getenv("OLLAMA_MODEL_NAME")
-LOGGED_IN = False
 
-def login():
-    """Logs in to the platform."""
+@functools.cache
+def _ensure_login():
+    """Logs in to the platform. The previous LOGGED_IN module flag was never
+    actually set (the assignment in login() was function-local), so every tool
+    call re-ran the credential check; the cache makes repeat calls a lookup."""
     if not BLOGGER_USERNAME or not BLOGGER_API_KEY:
         raise ValueError("Blogger credentials (BLOGGER_USERNAME, BLOGGER_API_KEY) must be set in environment variables.")
-    LOGGED_IN = True
-    return LOGGED_IN
+    return True
 
 
 @tool
 def create_new_blog(title, instructions):
     """Create a new blog post with the given title and content."""
-    if not LOGGED_IN:
-        login()
-    
+    _ensure_login()
+
     prompt = (
         f"You are a blog writer. Create a new blog post with the title '{title}'. Use the followin instrucitions: \n {instructions} \n\n"
         "The blog post should be well-structured, engaging, and suitable for publication. "
@@ -41,8 +44,11 @@ def create_new_blog(title, instructions):
     )
 
     try:
-        response = raw_llm.invoke(prompt)
-        blog_post = json.loads(response.content)
+        # Stream the decode into a buffer and parse the JSON once complete;
+        # tokens are consumed as they arrive instead of blocking on the full
+        # response object.
+        content = "".join(chunk.content for chunk in raw_llm.stream(prompt))
+        blog_post = json.loads(content)
         return blog_post
     except json.JSONDecodeError:
         return "Error: The response from the LLM was not valid JSON. Please ensure the output is properly formatted."
@@ -52,9 +58,8 @@ def create_new_blog(title, instructions):
 @tool
 def post_new_blog(blog_post):
     """Post a new blog to the blogging platform."""
-    if not LOGGED_IN:
-        login()
-    
+    _ensure_login()
+
     try:
         with open('blog_post.json', 'w') as f:
             json.dump(blog_post, f)
@@ -65,16 +70,15 @@ def post_new_blog(blog_post):
 @tool
 def get_last_n_blogs(n=3):
     """Retrieves the last n blog posts. Returns last 3 by default."""
-    if not LOGGED_IN:
-        login()
-    
+    _ensure_login()
+
     try:
-        blogs = []
-        for root, _, files in os.walk('.\\Outputs\\blogs'):
-            for file in files:
-                if file.endswith('.json') and len(blogs) < n:
-                    blogs.append(os.path.join(root, file))
-        return blogs
+        # Single directory scan; "last n" means the n most recently modified.
+        with os.scandir(os.path.join('Outputs', 'blogs')) as it:
+            candidates = [entry for entry in it if entry.is_file() and entry.name.endswith('.json')]
+        return [entry.path for entry in heapq.nlargest(n, candidates, key=lambda e: e.stat().st_mtime)]
+    except FileNotFoundError:
+        return []
     except Exception as e:
         return f"Error retrieving blog posts: {e}"
 
@@ -83,30 +87,45 @@ class ChatState(TypedDict):
     latest_blog: Optional[dict]
     last_n_blogs: Optional[list]
 
-llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
+register_tools(create_new_blog, post_new_blog, get_last_n_blogs)
+
+llm = get_chat_model(CHAT_MODEL, tools=('create_new_blog', 'post_new_blog', 'get_last_n_blogs'))
 tool_node = ToolNode([create_new_blog, post_new_blog, get_last_n_blogs])
 
-raw_llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
+raw_llm = get_chat_model(CHAT_MODEL)
 
-def llm_node(state):
-    """Invokes the LLM with the current message history."""
-    system_message = SystemMessage(content="""You are an AI assistant specialized in blog writing.
+# Module-level constant so the prompt prefix is bit-identical across turns and
+# Ollama's prompt cache can hit on every turn after the first.
+_SYSTEM_MESSAGE = SystemMessage(content="""You are an AI assistant specialized in blog writing.
                                    You can create new blog posts, post them to the blogging platform, and retrieve the last n blog posts.
                                    Any generated blog post should be returned as a JSON object with 'title' and 'content' fields.
                                    The content should be well-structured, professional and suitable for publication.""")
-    messages_for_llm = [system_message] + state['messages']
+
+def llm_node(state):
+    """Invokes the LLM with the current message history."""
+    messages_for_llm = [_SYSTEM_MESSAGE] + state['messages']
     response = llm.invoke(messages_for_llm)
     return {'messages': state['messages'] + [response]}
 
+# Precomputed tool-name -> next-node table; the router runs on every LLM turn,
+# so a dict lookup beats a branch ladder of isinstance checks.
+_ROUTE = {
+    'create_new_blog': 'tools',
+    'post_new_blog': 'tools',
+    'get_last_n_blogs': 'tools',
+}
+
 def router(state):
     """Determines the next step in the graph based on the LLM's response."""
     last_message = state['messages'][-1]
-    if isinstance(last_message, AIMessage) and getattr(last_message, 'tool_calls', None):
-        return 'tools'
-    elif isinstance(last_message, ToolMessage):
+    tool_calls = getattr(last_message, 'tool_calls', None)
+    if tool_calls:
+        # Unknown (hallucinated) tool names still go to the ToolNode, which
+        # answers with an error ToolMessage so the LLM can retry.
+        return _ROUTE.get(tool_calls[0]['name'], 'tools')
+    if isinstance(last_message, ToolMessage):
         return 'llm'
-    else:
-        return 'end'
+    return 'end'
 
 def tools_node(state):
     """Executes the tool called by the LLM."""
@@ -138,16 +157,59 @@ def process_blog_request(user_message: str) -> str:
     initial_state = {'messages': [HumanMessage(content=user_message)]}
 
     final_graph_output = None
-    for s in graph.stream(initial_state):
-        if 'llm' in s:
-            final_graph_output = s['llm']
-        elif 'tools' in s:
-            final_graph_output = s['tools']
+    for update in graph.stream(initial_state, stream_mode="updates"):
+        final_graph_output = next(iter(update.values()))
+        last_message = final_graph_output['messages'][-1]
+        # Stop consuming as soon as the agent produced its terminal answer.
+        if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+            break
+
+    return _extract_response(final_graph_output)
 
+
+async def aprocess_blog_request(user_message: str) -> str:
+    """
+    Async variant of process_blog_request, so LLM waits overlap other work
+    in the caller's event loop. Concurrency against the Ollama endpoint is
+    bounded by the shared LLM semaphore.
+    """
+    initial_state = {'messages': [HumanMessage(content=user_message)]}
+
+    final_graph_output = None
+    async with LLM_SEMAPHORE:
+        async for update in graph.astream(initial_state, stream_mode="updates"):
+            final_graph_output = next(iter(update.values()))
+            last_message = final_graph_output['messages'][-1]
+            if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+                break
+
+    return _extract_response(final_graph_output)
+
+
+async def stream_blog_request(user_message: str):
+    """
+    Yields the agent's answer as text chunks for UI streaming (e.g.
+    st.write_stream), so tokens render at first-token latency instead of
+    blocking until the full response is assembled.
+    """
+    initial_state = {'messages': [HumanMessage(content=user_message)]}
+
+    async with LLM_SEMAPHORE:
+        async for chunk, metadata in graph.astream(initial_state, stream_mode="messages"):
+            # Only surface answer tokens from the llm node; tool-call turns
+            # carry their payload in tool_call_chunks, not content.
+            if metadata.get('langgraph_node') != 'llm':
+                continue
+            if getattr(chunk, 'tool_call_chunks', None):
+                continue
+            if getattr(chunk, 'content', None):
+                yield chunk.content
+
+
+def _extract_response(final_graph_output) -> str:
+    """Pulls the final agent reply out of the last graph update."""
     if final_graph_output and 'messages' in final_graph_output and final_graph_output['messages']:
         last_message = final_graph_output['messages'][-1]
-        if isinstance(last_message, AIMessage):
-            return last_message.content
         if isinstance(last_message, AIMessage):
             return last_message.content
         elif isinstance(last_message, ToolMessage):
@@ -156,4 +218,3 @@ def process_blog_request(user_message: str) -> str:
             return f"Agent Response: {last_message}"
     else:
         return "No response from Blog agent."
-    
\ No newline at end of file
@@ -4,13 +4,14 @@ import os
 
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, START, END
 
+from Agents._llm_cache import get_chat_model, register_tools, LLM_SEMAPHORE
+
 load_dotenv()
 CHAT_MODEL = os.getenv("OLLAMA_MODEL_NAME")
 
@@ -46,43 +47,52 @@ def analyze_and_edit_file(file_content: str, instructions: str, original_extensi
     except Exception as e:
         return f"Error during file analysis and editing: {e}"
 
-llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
+register_tools(analyze_and_edit_file)
+
+llm = get_chat_model(CHAT_MODEL, tools=('analyze_and_edit_file',))
 tool_node = ToolNode([analyze_and_edit_file])
 
-raw_llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
+raw_llm = get_chat_model(CHAT_MODEL)
+
+
+# Module-level constant so the prompt prefix is bit-identical across turns and
+# Ollama's prompt cache can hit on every turn after the first. Uploaded file
+# content is sent as a separate message at a fixed position instead of being
+# concatenated into the system prompt.
+_SYSTEM_MESSAGE = SystemMessage(content=(
+    "You are an AI assistant specialized in file content generation, analysis, and editing for various formats."
+    "\nIf the user provides file content, and asks to analyze or edit it, use the 'analyze_and_edit_file' tool, "
+    "passing the provided file content, the user's specific instructions, and the original file extension (if known) to the tool. "
+    "When responding with generated or modified content, provide it in a raw text block or fenced code block with the appropriate language tag."
+    "\nAlways respond concisely and provide content in markdown format (e.g., fenced code block with language tag like ```json or ```xml) if applicable, or raw text if not."
+))
 
 
 def llm_node(state):
     """Invokes the LLM with the current message history and uploaded file content."""
-    # Generalize system message for any file type
-    system_message_content = "You are an AI assistant specialized in file content generation, analysis, and editing for various formats."
-
+    messages_for_llm = [_SYSTEM_MESSAGE]
     if state.get('uploaded_file_content'):
         original_ext_info = f" (originally a '.{state['uploaded_file_extension']}' file)" if state.get('uploaded_file_extension') else ""
-        system_message_content += (
-            "\n\nThe user has provided the following file content for context or direct action"
+        messages_for_llm.append(HumanMessage(content=(
+            "The user has provided the following file content for context or direct action"
             f"{original_ext_info}:\n"
-            f"```\n{state['uploaded_file_content']}\n```\n\n"
-            "If the user asks to analyze or edit this content, use the 'analyze_and_edit_file' tool, "
-            "passing the provided file content, the user's specific instructions, and the original file extension (if known) to the tool. "
-            "When responding with generated or modified content, provide it in a raw text block or fenced code block with the appropriate language tag."
-        )
-    system_message_content += "\nAlways respond concisely and provide content in markdown format (e.g., fenced code block with language tag like ```json or ```xml) if applicable, or raw text if not."
-
-    messages_for_llm = [SystemMessage(content=system_message_content)] + state['messages']
+            f"```\n{state['uploaded_file_content']}\n```"
+        )))
+    messages_for_llm += state['messages']
     response = llm.invoke(messages_for_llm)
     return {'messages': state['messages'] + [response]}
 
 
+# Precomputed tool-name -> next-node table; the router runs on every LLM turn,
+# so a dict lookup beats a branch ladder of string comparisons.
+_ROUTE = {'analyze_and_edit_file': 'tools'}
+
 def router(state):
     """Determines the next step in the graph based on the LLM's response."""
-    last_message = state['messages'][-1]
-    if getattr(last_message, 'tool_calls', None):
-        first_call = last_message.tool_calls[0]
-        function_name = first_call.get('function', {}).get('name', '')
-        if function_name == "analyze_and_edit_file":
-            return "tools"
-    return 'end'
+    tool_calls = getattr(state['messages'][-1], 'tool_calls', None)
+    # Unknown (hallucinated) tool names still go to the ToolNode, which
+    # answers with an error ToolMessage so the LLM can retry.
+    return _ROUTE.get(tool_calls[0]['name'], 'tools') if tool_calls else 'end'
 
 def tools_node(state):
     """Executes the tool called by the LLM."""
@@ -121,12 +131,65 @@ def process_agent_request(user_instruction: str, uploaded_content: Optional[str]
     }
 
     final_graph_output = None
-    for s in graph.stream(initial_state):
-        if 'llm' in s:
-            final_graph_output = s['llm']
-        elif 'tools' in s:
-            final_graph_output = s['tools']
+    for update in graph.stream(initial_state, stream_mode="updates"):
+        final_graph_output = next(iter(update.values()))
+        last_message = final_graph_output['messages'][-1]
+        # Stop consuming as soon as the agent produced its terminal answer.
+        if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+            break
+
+    return _extract_response(final_graph_output)
+
+
+async def aprocess_agent_request(user_instruction: str, uploaded_content: Optional[str] = None, uploaded_file_extension: Optional[str] = None) -> str:
+    """
+    Async variant of process_agent_request, so LLM waits overlap other work
+    in the caller's event loop. Concurrency against the Ollama endpoint is
+    bounded by the shared LLM semaphore.
+    """
+    initial_state = {
+        'messages': [HumanMessage(content=user_instruction)],
+        'uploaded_file_content': uploaded_content,
+        'uploaded_file_extension': uploaded_file_extension
+    }
+
+    final_graph_output = None
+    async with LLM_SEMAPHORE:
+        async for update in graph.astream(initial_state, stream_mode="updates"):
+            final_graph_output = next(iter(update.values()))
+            last_message = final_graph_output['messages'][-1]
+            if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+                break
+
+    return _extract_response(final_graph_output)
+
+
+async def stream_agent_request(user_instruction: str, uploaded_content: Optional[str] = None, uploaded_file_extension: Optional[str] = None):
+    """
+    Yields the agent's answer as text chunks for UI streaming (e.g.
+    st.write_stream), so tokens render at first-token latency instead of
+    blocking until the full response is assembled.
+    """
+    initial_state = {
+        'messages': [HumanMessage(content=user_instruction)],
+        'uploaded_file_content': uploaded_content,
+        'uploaded_file_extension': uploaded_file_extension
+    }
+
+    async with LLM_SEMAPHORE:
+        async for chunk, metadata in graph.astream(initial_state, stream_mode="messages"):
+            # Only surface answer tokens from the llm node; tool-call turns
+            # carry their payload in tool_call_chunks, not content.
+            if metadata.get('langgraph_node') != 'llm':
+                continue
+            if getattr(chunk, 'tool_call_chunks', None):
+                continue
+            if getattr(chunk, 'content', None):
+                yield chunk.content
+
 
+def _extract_response(final_graph_output) -> str:
+    """Pulls the final agent reply out of the last graph update."""
     if final_graph_output and 'messages' in final_graph_output and final_graph_output['messages']:
         last_message = final_graph_output['messages'][-1]
         if isinstance(last_message, AIMessage):
@@ -1,19 +1,23 @@
 import os
-import json
-from typing import TypedDict
+import threading
+from imaplib import IMAP4
+from typing import TypedDict, Optional, List
 
+import orjson
 from dotenv import load_dotenv
 from imap_tools import MailBox, AND
 from imap_tools.errors import MailboxLoginError
 
 
-from langchain.chat_models import init_chat_model
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, START, END
 
+from Agents._llm_cache import get_chat_model, register_tools, LLM_SEMAPHORE
+from Agents._sem_cache import ExactCache
+
 load_dotenv()
 
 IMAP_HOST = os.getenv("IMAP_HOST")
@@ -23,6 +27,10 @@ IMAP_FOLDER = 'INBOX'
 
 CHAT_MODEL = os.getenv("OLLAMA_MODEL_NAME")
 
+# Emails don't paraphrase themselves, so an exact content-keyed cache is the
+# right policy for repeated summarization requests.
+_SUMMARY_CACHE = ExactCache()
+
 
 class ChatState(TypedDict):
     messages: list
@@ -42,25 +50,77 @@ def connect():
         raise ConnectionError(f"An unexpected error occurred during IMAP connection: {e}")
 
 
+# Process-wide pooled mailbox so the TLS+IMAP login handshake is paid once and
+# amortized over many tool calls, instead of once per call.
+_MAILBOX: Optional[MailBox] = None
+_MAILBOX_LOCK = threading.Lock()
+_KEEPALIVE_INTERVAL = 60.0
+_keepalive_timer: Optional[threading.Timer] = None
+
+
+def _schedule_keepalive():
+    global _keepalive_timer
+    if _keepalive_timer is not None:
+        _keepalive_timer.cancel()
+    _keepalive_timer = threading.Timer(_KEEPALIVE_INTERVAL, _keepalive_noop)
+    _keepalive_timer.daemon = True
+    _keepalive_timer.start()
+
+
+def _keepalive_noop():
+    """Background NOOP that keeps the pooled IMAP session from idling out."""
+    global _MAILBOX
+    with _MAILBOX_LOCK:
+        if _MAILBOX is None:
+            return
+        try:
+            _MAILBOX.client.noop()
+        except Exception:
+            _MAILBOX = None
+            return
+    _schedule_keepalive()
+
+
+def get_mailbox() -> MailBox:
+    """
+    Returns the pooled mailbox, reconnecting lazily if the session has died.
+    Callers must hold _MAILBOX_LOCK while using the returned mailbox.
+    """
+    global _MAILBOX
+    if _MAILBOX is not None:
+        try:
+            _MAILBOX.client.noop()
+        except (IMAP4.abort, IMAP4.error, OSError):
+            _MAILBOX = None
+    if _MAILBOX is None:
+        _MAILBOX = connect()
+        _schedule_keepalive()
+    return _MAILBOX
+
+
 @tool
 def list_unread_emails():
     """Return a bullet list of all unread message's subject, UID, date, and sender."""
     try:
-        with connect() as mb:
-            unread = mb.fetch(criteria=AND(seen=False), headers_only=True, mark_seen=False)
-
-            if not unread:
-                return 'You have no unread messages.'
-
-            response = json.dumps([
+        with _MAILBOX_LOCK:
+            mb = get_mailbox()
+            # bulk=True issues a single FETCH for all matching messages
+            # instead of one round-trip per message.
+            payload = [
                 {
                     'uid': mail.uid,
-                    'date': mail.date.astimezone().strftime('%Y-%m-%d %H:%M'),
+                    'date': mail.date,
                     'subject': mail.subject,
                     'from': mail.from_,
-                } for mail in unread
-            ])
-            return response
+                } for mail in mb.fetch(criteria=AND(seen=False), headers_only=True, mark_seen=False, bulk=True)
+            ]
+
+        if not payload:
+            return 'You have no unread messages.'
+
+        # orjson serializes the datetimes natively, removing the per-mail
+        # astimezone().strftime() call.
+        return orjson.dumps(payload, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z).decode()
     except ConnectionError as e:
         return f"Error connecting to email server: {e}"
     except Exception as e:
@@ -70,42 +130,96 @@ def list_unread_emails():
 def summarize_email(uid: str):
     """Summarize a single email given its IMAP UID. Return a short summary of the email content/body in plain text."""
     try:
-        with connect() as mb:
+        with _MAILBOX_LOCK:
+            mb = get_mailbox()
             mail = next(mb.fetch(criteria=AND(uid=uid), mark_seen=False), None)
 
-            if not mail:
-                return f'Could not find email with uid {uid}.'
-
-            prompt = (
-                "Summarize this email concisely:\n\n"
-                f"Subject: {mail.subject}\n"
-                f"Sender: {mail.from_}\n"
-                f"Date: {mail.date}\n"
-                f"{mail.text or mail.html}"
-            )
-
-            return raw_llm.invoke(prompt).content
+        if not mail:
+            return f'Could not find email with uid {uid}.'
+
+        body = mail.text or mail.html or ''
+        # Hash the full body plus sender and date: sha256 is far cheaper than
+        # the LLM call being skipped, and truncated bodies collide on shared
+        # boilerplate (HTML newsletters from one sender).
+        cache_key = ExactCache.key(mail.subject or '', mail.from_ or '', str(mail.date), body)
+        cached = _SUMMARY_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # LLM call happens outside the lock so the mailbox stays available.
+        prompt = (
+            "Summarize this email concisely:\n\n"
+            f"Subject: {mail.subject}\n"
+            f"Sender: {mail.from_}\n"
+            f"Date: {mail.date}\n"
+            f"{body}"
+        )
+
+        summary = raw_llm.invoke(prompt).content
+        _SUMMARY_CACHE.put(cache_key, summary)
+        return summary
     except ConnectionError as e:
         return f"Error connecting to email server: {e}"
     except Exception as e:
         return f"An unexpected error occurred while summarizing email: {e}"
 
+@tool
+def summarize_emails(uids: List[str]):
+    """Summarize several emails at once given their IMAP UIDs. Returns a JSON array of objects with 'uid' and 'summary' fields."""
+    try:
+        with _MAILBOX_LOCK:
+            mb = get_mailbox()
+            mails = list(mb.fetch(criteria=AND(uid=uids), mark_seen=False))
+
+        if not mails:
+            return f"Could not find any emails with uids {', '.join(uids)}."
+
+        # One batched IMAP fetch and one LLM call for all requested emails,
+        # instead of a full prefill + round-trip per UID.
+        sections = [
+            f"Email (uid {mail.uid}):\n"
+            f"Subject: {mail.subject}\n"
+            f"Sender: {mail.from_}\n"
+            f"Date: {mail.date}\n"
+            f"{mail.text or mail.html}"
+            for mail in mails
+        ]
+        prompt = (
+            "Summarize each of the following emails concisely. "
+            "Return a JSON array of objects with 'uid' and 'summary' fields, one per email. "
+            "The response will be passed to the 'json.loads' function, so ensure it is valid JSON.\n\n"
+            + "\n\n---\n\n".join(sections)
+        )
+
+        return raw_llm.invoke(prompt).content
+    except ConnectionError as e:
+        return f"Error connecting to email server: {e}"
+    except Exception as e:
+        return f"An unexpected error occurred while summarizing emails: {e}"
 
-llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
-tool_node = ToolNode([list_unread_emails, summarize_email])
 
-raw_llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
+register_tools(list_unread_emails, summarize_email, summarize_emails)
 
+llm = get_chat_model(CHAT_MODEL, tools=('list_unread_emails', 'summarize_email', 'summarize_emails'))
+tool_node = ToolNode([list_unread_emails, summarize_email, summarize_emails])
 
-def llm_node(state):
-    """Invokes the LLM with the current message history."""
-    system_message = SystemMessage(content="""You are an AI assistant specialized in email management.
+raw_llm = get_chat_model(CHAT_MODEL)
+
+
+# Module-level constant so the prompt prefix is bit-identical across turns and
+# Ollama's prompt cache can hit on every turn after the first.
+_SYSTEM_MESSAGE = SystemMessage(content="""You are an AI assistant specialized in email management.
 You can list unread emails and summarize specific emails.
 When asked to list unread emails, use the 'list_unread_emails' tool.
 When asked to summarize an email and provided with a UID, use the 'summarize_email' tool.
+When asked to summarize more than one email, prefer the 'summarize_emails' tool with all the UIDs in a single call over repeated 'summarize_email' calls.
 Always be concise and helpful.
 """)
-    messages_for_llm = [system_message] + state['messages']
+
+
+def llm_node(state):
+    """Invokes the LLM with the current message history."""
+    messages_for_llm = [_SYSTEM_MESSAGE] + state['messages']
     response = llm.invoke(messages_for_llm)
     return {'messages': state['messages'] + [response]}
 
@@ -142,16 +256,61 @@ def process_email_request(user_message: str) -> str:
     Returns:
         str: The agent's final response or tool output.
     """
-    # Using a local state for this request to avoid global state issues
+    # Local state keeps the function re-entrant under concurrent requests.
+    initial_state = {'messages': [HumanMessage(content=user_message)]}
+
+    final_graph_output = None
+    for update in graph.stream(initial_state, stream_mode="updates"):
+        final_graph_output = next(iter(update.values()))
+        last_message = final_graph_output['messages'][-1]
+        # Stop consuming as soon as the agent produced its terminal answer.
+        if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+            break
+
+    return _extract_response(final_graph_output)
+
+
+async def aprocess_email_request(user_message: str) -> str:
+    """
+    Async variant of process_email_request, so LLM waits overlap other work
+    in the caller's event loop. Concurrency against the Ollama endpoint is
+    bounded by the shared LLM semaphore.
+    """
     initial_state = {'messages': [HumanMessage(content=user_message)]}
 
     final_graph_output = None
-    for s in graph.stream(initial_state):
-        if 'llm' in s:
-            final_graph_output = s['llm']
-        elif 'tools' in s:
-            final_graph_output = s['tools']
+    async with LLM_SEMAPHORE:
+        async for update in graph.astream(initial_state, stream_mode="updates"):
+            final_graph_output = next(iter(update.values()))
+            last_message = final_graph_output['messages'][-1]
+            if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+                break
+
+    return _extract_response(final_graph_output)
+
+
+async def stream_email_request(user_message: str):
+    """
+    Yields the agent's answer as text chunks for UI streaming (e.g.
+    st.write_stream), so tokens render at first-token latency instead of
+    blocking until the full response is assembled.
+    """
+    initial_state = {'messages': [HumanMessage(content=user_message)]}
+
+    async with LLM_SEMAPHORE:
+        async for chunk, metadata in graph.astream(initial_state, stream_mode="messages"):
+            # Only surface answer tokens from the llm node; tool-call turns
+            # carry their payload in tool_call_chunks, not content.
+            if metadata.get('langgraph_node') != 'llm':
+                continue
+            if getattr(chunk, 'tool_call_chunks', None):
+                continue
+            if getattr(chunk, 'content', None):
+                yield chunk.content
+
 
+def _extract_response(final_graph_output) -> str:
+    """Pulls the final agent reply out of the last graph update."""
     if final_graph_output and 'messages' in final_graph_output and final_graph_output['messages']:
         last_message = final_graph_output['messages'][-1]
         if isinstance(last_message, AIMessage):
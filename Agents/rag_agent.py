@@ -1,13 +1,22 @@
 import os
 import io
+import asyncio
+import hashlib
+from collections import OrderedDict
 from typing import TypedDict, Optional, List
-from PyPDF2 import PdfReader
+
+import numpy as np
+import tiktoken
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+import fitz
 from docx import Document
 
 from dotenv import load_dotenv
 
-from langchain.chat_models import init_chat_model
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -15,12 +24,48 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import StateGraph, START, END
 
+from Agents._llm_cache import get_chat_model, get_embeddings_model, register_tools, LLM_SEMAPHORE
+from Agents._sem_cache import SemanticCache, ExactCache
+
 load_dotenv()
 CHAT_MODEL = os.getenv("OLLAMA_MODEL_NAME")
 EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL")
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
+# Chunk sizes are measured in tokens (see _token_len), not characters, so
+# chunks are right-sized for the embedding model's context window.
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 64
 TOP_K_RETRIEVAL = 4
+# Chunks per concurrent embedding request; keep in line with the Ollama
+# server's OLLAMA_NUM_PARALLEL setting.
+EMBED_SHARD_SIZE = 32
+
+# On-disk ingest cache: re-uploading a document that was already parsed and
+# embedded (with the same model and chunking settings) returns in milliseconds
+# instead of re-running the whole pipeline.
+RAG_CACHE_DIR = os.path.join('Outputs', 'rag_cache')
+_INGEST_LRU_SIZE = 2
+_INGEST_LRU: OrderedDict = OrderedDict()
+
+# Shared between ingest and retrieval so the HTTP client/session is built once.
+_EMB_MODEL = get_embeddings_model(EMBEDDING_MODEL)
+
+_ENCODING = tiktoken.get_encoding("cl100k_base")
+
+def _token_len(text: str) -> int:
+    """Measures text length in tokens rather than characters."""
+    return len(_ENCODING.encode(text, disallowed_special=()))
+
+# Built once so the separator regexes are compiled a single time rather than
+# on every document ingest.
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=_token_len,
+    is_separator_regex=False,
+)
+
+# Semantically equivalent questions against the same context skip the LLM.
+_ANSWER_CACHE = SemanticCache(embed=_EMB_MODEL.embed_query)
 
 class ChatState(TypedDict):
     """
@@ -28,36 +73,138 @@ class ChatState(TypedDict):
     """
     messages: list
 
-def _load_pdf(file_content: io.BytesIO) -> str:
-    """Loads text from a PDF file."""
-    reader = PdfReader(file_content)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
+def _load_pdf(file_content) -> str:
+    """Loads text from a PDF file-like object."""
+    # PyMuPDF's C-backed extractor is several times faster than PyPDF2, and
+    # the single join avoids quadratic string concatenation across pages.
+    # fitz accepts the buffer directly, so no extra bytes copy is made.
+    with fitz.open(stream=file_content, filetype='pdf') as doc:
+        return '\n'.join(page.get_text('text') for page in doc)
 
-def _load_docx(file_content: io.BytesIO) -> str:
-    """Loads text from a DOCX file."""
+def _load_docx(file_content) -> str:
+    """Loads text from a DOCX file-like object."""
     document = Document(file_content)
-    text = "\n".join([paragraph.text for paragraph in document.paragraphs])
-    return text
-
-def _load_txt(file_content: io.BytesIO) -> str:
-    """Loads text from a TXT file."""
-    return file_content.read().decode('utf-8')
-
-def load_and_process_document(file_bytes: bytes, file_type: str) -> List[dict]:
+    paragraphs = document.paragraphs
+    return "\n".join(paragraph.text for paragraph in paragraphs)
+
+def _load_txt(file_content) -> str:
+    """Loads text from a TXT file-like object."""
+    # Buffered incremental decode instead of read().decode(), so the bytes
+    # and str never coexist as two full copies.
+    wrapper = io.TextIOWrapper(file_content, encoding='utf-8', errors='replace')
+    try:
+        return wrapper.read()
+    finally:
+        # Detach so closing the wrapper doesn't close the caller's buffer.
+        wrapper.detach()
+
+async def _aembed_shards(texts: List[str]) -> list:
+    """Embeds shards of the chunk list concurrently against the Ollama server."""
+    shards = [texts[i:i + EMBED_SHARD_SIZE] for i in range(0, len(texts), EMBED_SHARD_SIZE)]
+    results = await asyncio.gather(*(_EMB_MODEL.aembed_documents(shard) for shard in shards))
+    return [vector for shard_vectors in results for vector in shard_vectors]
+
+def _embed_texts(texts: List[str]) -> list:
+    """
+    Embeds chunk texts with concurrent sharded requests, so a large document
+    is spread over Ollama's parallel request slots instead of queuing behind
+    one batched call.
+    """
+    if len(texts) <= EMBED_SHARD_SIZE:
+        return _EMB_MODEL.embed_documents(texts)
+    return asyncio.run(_aembed_shards(texts))
+
+def _assemble_store(texts: List[str], matrix: np.ndarray) -> dict:
+    """Builds the retrieval store (quantized embeddings + ANN index) from raw embeddings."""
+    # Symmetric int8 quantization: an eighth of the bytes of float64 lists,
+    # and similarity ranking only needs relative ordering, which int8 dot
+    # products preserve almost perfectly.
+    scales = np.maximum(np.abs(matrix).max(axis=1, keepdims=True) / 127.0, 1e-10)
+    quantized = np.round(matrix / scales).astype(np.int8)
+
+    return {
+        'texts': texts,
+        'quantized': quantized,
+        'scales': scales.ravel(),
+        'norms': np.linalg.norm(matrix, axis=1),
+        'index': _build_ann_index(matrix),
+    }
+
+def _ingest_cache_key(file_source) -> str:
+    """Content-addressed key; changing the model or chunking invalidates it."""
+    if hasattr(file_source, 'read'):
+        # file_digest hashes through a fixed-size buffer instead of pulling
+        # the whole file into memory first.
+        digest = hashlib.file_digest(file_source, hashlib.sha256).hexdigest()
+        file_source.seek(0)
+    else:
+        digest = hashlib.sha256(file_source).hexdigest()
+    return f"{digest}-{EMBEDDING_MODEL}-{CHUNK_SIZE}-{CHUNK_OVERLAP}"
+
+def _load_cached_ingest(key: str) -> Optional[dict]:
+    path = os.path.join(RAG_CACHE_DIR, f"{key}.npz")
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=True) as data:
+            texts = list(data['texts'])
+            matrix = np.asarray(data['matrix'], dtype=np.float32)
+    except Exception:
+        return None
+    return _assemble_store(texts, matrix)
+
+def _save_cached_ingest(key: str, texts: List[str], matrix: np.ndarray) -> None:
+    try:
+        os.makedirs(RAG_CACHE_DIR, exist_ok=True)
+        path = os.path.join(RAG_CACHE_DIR, f"{key}.npz")
+        # Write to a temp file and rename so a crash never publishes a
+        # half-written cache entry.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, matrix=matrix, texts=np.array(texts, dtype=object))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _lru_put(key: str, store: dict) -> None:
+    _INGEST_LRU[key] = store
+    _INGEST_LRU.move_to_end(key)
+    while len(_INGEST_LRU) > _INGEST_LRU_SIZE:
+        _INGEST_LRU.popitem(last=False)
+
+def load_and_process_document(file_source, file_type: str) -> dict:
     """
     Loads a document, splits it into chunks, and generates embeddings for each chunk.
 
+    Repeat ingests of the same content (with the same embedding model and
+    chunking settings) are served from a small in-memory LRU or the on-disk
+    cache under Outputs/rag_cache instead of being re-parsed and re-embedded.
+
     Args:
-        file_bytes (bytes): The raw bytes content of the uploaded file.
+        file_source: A seekable binary file-like object (e.g. an upload
+                     buffer), or the raw bytes content of the uploaded file.
         file_type (str): The type of the file (e.g., 'pdf', 'docx', 'txt').
 
     Returns:
-        List[dict]: A list of dictionaries, where each dict contains 'text' and 'embedding'.
+        dict: A dictionary with 'texts' (list of chunk strings), 'quantized'
+              (an int8 (N, D) ndarray of symmetrically quantized chunk
+              embeddings), 'scales' (the per-row dequantization scales) and
+              'norms' (the per-row L2 norms of the original embeddings) and
+              'index' (a FAISS HNSW index over the embeddings, or None when
+              faiss is not installed).
     """
-    file_content = io.BytesIO(file_bytes)
+    key = _ingest_cache_key(file_source)
+    if key in _INGEST_LRU:
+        _INGEST_LRU.move_to_end(key)
+        return _INGEST_LRU[key]
+
+    cached = _load_cached_ingest(key)
+    if cached is not None:
+        _lru_put(key, cached)
+        return cached
+
+    # Uploads arrive as in-memory buffers already; only raw bytes need a wrap.
+    file_content = file_source if hasattr(file_source, 'read') else io.BytesIO(file_source)
     raw_text = ""
 
     if file_type == 'pdf':
@@ -70,60 +217,82 @@ def load_and_process_document(file_bytes: bytes, file_type: str) -> List[dict]:
         raise ValueError(f"Unsupported file type: {file_type}")
 
     if not raw_text:
-        return []
+        return {
+            'texts': [],
+            'quantized': np.empty((0, 0), dtype=np.int8),
+            'scales': np.empty(0, dtype=np.float32),
+            'norms': np.empty(0, dtype=np.float32),
+            'index': None,
+        }
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    chunks = text_splitter.create_documents([raw_text])
+    chunks = _SPLITTER.create_documents([raw_text])
+
+    texts = [chunk.page_content for chunk in chunks]
+    matrix = np.asarray(_embed_texts(texts), dtype=np.float32)
 
-    embeddings_model = OllamaEmbeddings(model=EMBEDDING_MODEL)
+    _save_cached_ingest(key, texts, matrix)
+    store = _assemble_store(texts, matrix)
+    _lru_put(key, store)
+    return store
 
-    processed_chunks = []
-    for i, chunk in enumerate(chunks):
-        embedding = embeddings_model.embed_query(chunk.page_content)
-        processed_chunks.append({
-            'text': chunk.page_content,
-            'embedding': embedding,
-            'chunk_id': i
-        })
-    return processed_chunks
+def _build_ann_index(matrix: np.ndarray):
+    """Builds a FAISS HNSW index over L2-normalized embeddings, if faiss is available."""
+    if faiss is None or matrix.shape[0] == 0:
+        return None
+    normalized = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-10)
+    index = faiss.IndexHNSWFlat(matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.add(normalized.astype(np.float32))
+    return index
 
 @tool
-def retrieve_context(question: str, document_chunks: List[dict]) -> str:
+def retrieve_context(question: str, document_chunks: dict) -> str:
     """
     Retrieves the most relevant document chunks based on the question.
 
     Args:
         question (str): The user's question.
-        document_chunks (List[dict]): A list of dictionaries, each containing 'text' and 'embedding'.
+        document_chunks (dict): The processed document store with 'texts', 'quantized', 'scales' and 'norms'.
 
     Returns:
         str: A concatenated string of the most relevant text chunks.
     """
-    if not document_chunks:
+    if not document_chunks or not document_chunks['texts']:
         return "No document loaded or processed to retrieve context from."
 
-    embeddings_model = OllamaEmbeddings(model=EMBEDDING_MODEL)
-    question_embedding = embeddings_model.embed_query(question)
+    question_embedding = np.asarray(_EMB_MODEL.embed_query(question), dtype=np.float32)
+    top_k = min(TOP_K_RETRIEVAL, len(document_chunks['texts']))
 
-    similarities = []
-    for chunk in document_chunks:
-        if isinstance(chunk['embedding'], list) and all(isinstance(x, (int, float)) for x in chunk['embedding']):
-            similarity = sum(q_i * c_i for q_i, c_i in zip(question_embedding, chunk['embedding']))
-            similarities.append((similarity, chunk['text']))
-        else:
-            print(f"Warning: Invalid embedding format for chunk: {chunk['embedding']}")
+    if document_chunks.get('index') is not None:
+        # Sub-linear ANN lookup over the HNSW index built at ingest time.
+        q_normalized = question_embedding / max(np.linalg.norm(question_embedding), 1e-10)
+        _, neighbours = document_chunks['index'].search(q_normalized.reshape(1, -1), top_k)
+        idx = [i for i in neighbours[0] if i >= 0]
+    else:
+        # Linear-scan fallback: quantize the question the same way as the
+        # stored chunks and do a single integer matrix-vector product (int32
+        # accumulation to avoid overflow). Per-row scales and norms turn the
+        # raw dot products back into cosine scores.
+        q_scale = max(np.abs(question_embedding).max() / 127.0, 1e-10)
+        q_quantized = np.round(question_embedding / q_scale).astype(np.int8)
+        int_scores = document_chunks['quantized'].astype(np.int32) @ q_quantized.astype(np.int32)
+        scores = int_scores * document_chunks['scales'] / np.maximum(document_chunks['norms'], 1e-10)
 
-    similarities.sort(key=lambda x: x[0], reverse=True)
-    top_k_chunks = [text for _, text in similarities[:TOP_K_RETRIEVAL]]
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        idx = idx[np.argsort(-scores[idx])]
+
+    top_k_chunks = [document_chunks['texts'][i] for i in idx]
 
     context = "\n\n".join(top_k_chunks)
     return context if context else "No relevant context found."
 
+# Module-level constant so the prompt prefix is bit-identical across calls and
+# Ollama's prompt cache can hit on every call after the first.
+_ANSWER_PROMPT_PREFIX = (
+    "You are an AI assistant specialized in answering questions based on provided document context. "
+    "Answer the following question truthfully and concisely, using ONLY the information from the context below. "
+    "If the answer cannot be found in the context, state that you don't have enough information.\n\n"
+)
+
 @tool
 def answer_question(question: str, context: str) -> str:
     """
@@ -136,21 +305,57 @@ def answer_question(question: str, context: str) -> str:
     Returns:
         str: The generated answer.
     """
-    llm = init_chat_model(CHAT_MODEL, model_provider='ollama')
+    context_hash = ExactCache.key(context)
+    cached, question_vector = _ANSWER_CACHE.get(question, namespace=context_hash)
+    if cached is not None:
+        return cached
+
+    llm = get_chat_model(CHAT_MODEL)
 
     prompt = (
-        f"You are an AI assistant specialized in answering questions based on provided document context. "
-        f"Answer the following question truthfully and concisely, using ONLY the information from the context below. "
-        f"If the answer cannot be found in the context, state that you don't have enough information.\n\n"
+        _ANSWER_PROMPT_PREFIX +
         f"Question: {question}\n\n"
         f"Context:\n{context}\n\n"
         f"Answer:"
     )
-    response = llm.invoke(prompt).content
+    # Stream the decode into a buffer: tokens are consumed as they arrive
+    # instead of blocking on the full response object.
+    response = "".join(chunk.content for chunk in llm.stream(prompt))
+    # Reuse the vector from the lookup so the miss path embeds only once.
+    _ANSWER_CACHE.put(question, response, namespace=context_hash, vector=question_vector)
     return response
 
-llm_with_tools = init_chat_model(CHAT_MODEL, model_provider='ollama')
-tool_node = ToolNode([retrieve_context, answer_question])
+@tool
+def answer_questions(questions: List[str], context: str) -> str:
+    """
+    Generates answers to several questions against the same context in one
+    LLM call. Returns a JSON array of objects with 'question' and 'answer'
+    fields.
+
+    Args:
+        questions (List[str]): The user's questions.
+        context (str): The retrieved context from the document.
+
+    Returns:
+        str: The generated answers as a JSON array.
+    """
+    llm = get_chat_model(CHAT_MODEL)
+
+    numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(questions))
+    prompt = (
+        _ANSWER_PROMPT_PREFIX +
+        f"Questions:\n{numbered}\n\n"
+        f"Context:\n{context}\n\n"
+        "Return a JSON array of objects with 'question' and 'answer' fields, one per question. "
+        "The response will be passed to the 'json.loads' function, so ensure it is valid JSON.\n"
+        "Answers:"
+    )
+    return llm.invoke(prompt).content
+
+register_tools(retrieve_context, answer_question, answer_questions)
+
+llm_with_tools = get_chat_model(CHAT_MODEL, tools=('retrieve_context', 'answer_question', 'answer_questions'))
+tool_node = ToolNode([retrieve_context, answer_question, answer_questions])
 
 def llm_node(state: ChatState) -> dict:
     """
@@ -197,14 +402,17 @@ builder.add_conditional_edges('llm', router, {'tools': 'tools', 'end': END})
 graph = builder.compile()
 
 # --- Main Entry Point for RAG Agent (Question Answering) ---
-def process_rag_request(user_question: str, document_chunks: Optional[List[dict]] = None) -> str:
+def process_rag_request(user_question: str, document_chunks: Optional[dict] = None) -> str:
     """
     Processes a user question using the RAG agent graph.
 
     Args:
         user_question (str): The question from the user.
-        document_chunks (Optional[List[dict]]): The pre-processed document chunks with embeddings.
-                                                 This is crucial for the retrieve_context tool.
+        document_chunks (Optional[dict]): The processed document store from
+                                          load_and_process_document ('texts',
+                                          'quantized', 'scales', 'norms',
+                                          'index'). This is crucial for the
+                                          retrieve_context tool.
 
     Returns:
         str: The agent's final answer.
@@ -224,12 +432,70 @@ def process_rag_request(user_question: str, document_chunks: Optional[List[dict]
         return "Error: No document processed. Please upload and process a document first."
 
     final_graph_output = None
-    for s in graph.stream(initial_state):
-        if 'llm' in s:
-            final_graph_output = s['llm']
-        elif 'tools' in s:
-            final_graph_output = s['tools']
+    for update in graph.stream(initial_state, stream_mode="updates"):
+        final_graph_output = next(iter(update.values()))
+        last_message = final_graph_output['messages'][-1]
+        # Stop consuming as soon as the agent produced its terminal answer.
+        if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+            break
+
+    return _extract_response(final_graph_output)
+
+
+async def aprocess_rag_request(user_question: str, document_chunks: Optional[dict] = None) -> str:
+    """
+    Async variant of process_rag_request, so LLM waits overlap other work
+    in the caller's event loop. Concurrency against the Ollama endpoint is
+    bounded by the shared LLM semaphore.
+    """
+    if not document_chunks:
+        return "Error: No document processed. Please upload and process a document first."
+
+    initial_state = {
+        'messages': [HumanMessage(content=user_question)],
+        'document_chunks': document_chunks
+    }
+
+    final_graph_output = None
+    async with LLM_SEMAPHORE:
+        async for update in graph.astream(initial_state, stream_mode="updates"):
+            final_graph_output = next(iter(update.values()))
+            last_message = final_graph_output['messages'][-1]
+            if isinstance(last_message, AIMessage) and not getattr(last_message, 'tool_calls', None):
+                break
+
+    return _extract_response(final_graph_output)
+
 
+async def stream_rag_request(user_question: str, document_chunks: Optional[dict] = None):
+    """
+    Yields the agent's answer as text chunks for UI streaming (e.g.
+    st.write_stream), so tokens render at first-token latency instead of
+    blocking until the full response is assembled.
+    """
+    if not document_chunks:
+        yield "Error: No document processed. Please upload and process a document first."
+        return
+
+    initial_state = {
+        'messages': [HumanMessage(content=user_question)],
+        'document_chunks': document_chunks
+    }
+
+    async with LLM_SEMAPHORE:
+        async for chunk, metadata in graph.astream(initial_state, stream_mode="messages"):
+            # Only surface answer tokens from the llm node; tool-call turns
+            # carry their payload in tool_call_chunks, not content.
+            if metadata.get('langgraph_node') != 'llm':
+                continue
+            if getattr(chunk, 'tool_call_chunks', None):
+                continue
+            if getattr(chunk, 'content', None):
+                yield chunk.content
+
+
+def _extract_response(final_graph_output) -> str:
+    """Pulls the final agent reply out of the last graph update."""
     if final_graph_output and 'messages' in final_graph_output and final_graph_output['messages']:
         last_message = final_graph_output['messages'][-1]
         if isinstance(last_message, AIMessage):
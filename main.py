@@ -1,16 +1,14 @@
 import streamlit as st
 import os
-from dotenv import load_dotenv, set_key, unset_key, find_dotenv
-import json
-import sys
+import hashlib
+from dotenv import load_dotenv, set_key, unset_key, find_dotenv, dotenv_values
+import re
 import io
 
-sys.path.insert(0, './Agents')
-
-from Agents.code_agent import process_agent_request as process_code_request
-from Agents.email_agent import process_email_request as process_email_request
-from Agents.rag_agent import load_and_process_document, process_rag_request
-from Agents.blog_writer import process_blog_request as process_blog_request
+# Agent modules are imported lazily inside their page fragments so only the
+# selected page pays for its heavy transitive imports (LLM clients, PDF/DOCX
+# parsers, embeddings). Python caches them in sys.modules, so reruns after the
+# first visit are a dict lookup.
 
 load_dotenv()
 
@@ -27,49 +25,111 @@ st.sidebar.markdown("---")
 st.sidebar.info("All agents run locally. Ensure Ollama models are pulled and .env is configured.")
 
 
-if "code_chat_history" not in st.session_state:
-    st.session_state.code_chat_history = []
-if "email_chat_history" not in st.session_state:
-    st.session_state.email_chat_history = []
-if "rag_chat_history" not in st.session_state:
-    st.session_state.rag_chat_history = []
-if "rag_document_chunks" not in st.session_state:
-    st.session_state.rag_document_chunks = None
-if "rag_is_document_loaded" not in st.session_state:
-    st.session_state.rag_is_document_loaded = False
-if "rag_uploaded_file_name" not in st.session_state:
-    st.session_state.rag_uploaded_file_name = None
-if "blog_chat_history" not in st.session_state:
-    st.session_state.blog_chat_history = []
-if "latest_blog" not in st.session_state:
-    st.session_state.latest_blog = None
-if "blogs_latest_n" not in st.session_state:
-    st.session_state.last_n_blog_list = []
-if "env_vars" not in st.session_state:
-    st.session_state.env_vars = {}
-if "generated_code_output" not in st.session_state:
-    st.session_state.generated_code_output = ""
-if "generated_file_name" not in st.session_state:
-    st.session_state.generated_file_name = "generated_file.txt"
+# Session-state defaults as (key, factory) pairs applied through one
+# setdefault loop, instead of a ladder of per-key membership checks against
+# the session-state proxy on every rerun. Factories keep mutable defaults
+# per-session.
+_DEFAULTS = (
+    ("code_chat_history", list),
+    ("email_chat_history", list),
+    ("rag_chat_history", list),
+    ("rag_doc_hash", lambda: None),
+    ("rag_is_document_loaded", lambda: False),
+    ("rag_uploaded_file_name", lambda: None),
+    ("blog_chat_history", list),
+    ("latest_blog", lambda: None),
+    ("last_n_blog_list", list),
+    ("env_vars", dict),
+    ("generated_code_output", lambda: ""),
+    ("generated_file_name", lambda: "generated_file.txt"),
+)
+
+for _key, _factory in _DEFAULTS:
+    if _key not in st.session_state:
+        st.session_state[_key] = _factory()
+
+
+@st.cache_data(show_spinner=False)
+def _parse_env(env_path: str, mtime: float) -> dict:
+    # mtime is part of the cache key: reruns reuse the memoized dict and the
+    # file is only reparsed when it actually changes on disk. dotenv_values
+    # parses the whole file in one call, with proper quoting/escape handling.
+    if env_path and os.path.exists(env_path):
+        return dict(dotenv_values(env_path))
+    return {}
+
+
+@st.cache_resource
+def _env_path() -> str:
+    # find_dotenv walks parent directories on every call; resolve the path
+    # once per process and reuse it everywhere.
+    return find_dotenv() or os.path.abspath(".env")
 
 
 def load_env_file():
-    env_path = find_dotenv()
-    env_dict = {}
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        env_dict[key] = value
-    st.session_state.env_vars = env_dict
+    env_path = _env_path()
+    mtime = os.path.getmtime(env_path) if os.path.exists(env_path) else 0.0
+    st.session_state.env_vars = _parse_env(env_path, mtime)
 
 load_env_file()
 
 
-if page_selection == "🤖 Code Agent":
+@st.cache_resource
+def _chunk_store() -> dict:
+    # One process-wide store of processed documents keyed by content hash,
+    # shared across sessions. cache_resource keeps the live objects (embedding
+    # arrays, ANN index) without cache_data's pickle/copy tax, and sessions
+    # only hold the hash.
+    return {}
+
+
+# Single-pass extraction of a fenced code block and its language tag from an
+# agent response. Compiled once; the old lstrip/rstrip approach treated its
+# argument as a character set (a correctness bug) and rescanned the whole
+# string repeatedly.
+_CODE_FENCE_RE = re.compile(r"^```([^\n]*)\n(.*?)\n```\s*$", re.DOTALL)
+
+# Only the most recent messages render inline; older ones sit behind an
+# expander so per-rerun render cost stays bounded as histories grow.
+_HISTORY_WINDOW = 50
+
+
+def _render_chat_message(message):
+    role = message["role"]
+    if role == "user":
+        with st.chat_message("user"):
+            st.markdown(message["content"])
+    elif role == "code_upload":
+        with st.chat_message("user"):
+            st.markdown(f"**Uploaded Content:**\n```\n{message['content']}\n```")
+    elif role == "system":
+        st.info(message["content"])
+    else:
+        with st.chat_message("assistant"):
+            st.markdown(message["content"])
+
+
+def _render_chat_history(history, skip_last=0):
+    # skip_last hides messages that the caller already rendered in this run
+    # (a just-streamed answer), so they don't appear twice.
+    if skip_last:
+        history = history[:-skip_last]
+    if len(history) > _HISTORY_WINDOW:
+        with st.expander("Earlier messages"):
+            for message in history[:-_HISTORY_WINDOW]:
+                _render_chat_message(message)
+    for message in history[-_HISTORY_WINDOW:]:
+        _render_chat_message(message)
+
+
+# Each agent pane is a fragment: interacting with widgets inside it reruns
+# only the fragment, not the whole script, so one pane's chat-history loop
+# doesn't re-execute for unrelated events elsewhere on the page.
+
+@st.fragment
+def _code_agent_fragment():
+    from Agents.code_agent import stream_agent_request as stream_code_request
+
     st.header("Code Agent 🤖")
     st.markdown("Generate, analyze, and edit any file content. Generated content will be available for download.")
 
@@ -79,34 +139,39 @@ if page_selection == "🤖 Code Agent":
     uploaded_code_content = None
     uploaded_file_extension = None
     if uploaded_file is not None:
-        uploaded_code_content = uploaded_file.read().decode("utf-8")
+        # Incremental decode through a buffered wrapper instead of
+        # read().decode(), which holds the upload in memory twice.
+        uploaded_file.seek(0)
+        wrapper = io.TextIOWrapper(uploaded_file, encoding="utf-8", errors="replace")
+        uploaded_code_content = wrapper.read()
+        wrapper.detach()
         file_name_parts = uploaded_file.name.split('.')
         if len(file_name_parts) > 1:
             uploaded_file_extension = file_name_parts[-1]
         st.code(uploaded_code_content, language=uploaded_file_extension if uploaded_file_extension else "plaintext")
 
 
+    streamed_this_run = False
     if st.button("Run Code Agent", key="run_code_agent_btn"):
         if user_query:
-            with st.spinner("Code Agent is processing..."):
-                response = process_code_request(user_query, uploaded_content=uploaded_code_content, uploaded_file_extension=uploaded_file_extension)
-                st.session_state.code_chat_history.append({"role": "user", "content": user_query})
-                if uploaded_code_content:
-                    st.session_state.code_chat_history.append({"role": "code_upload", "content": uploaded_code_content})
-                st.session_state.code_chat_history.append({"role": "agent", "content": response})
-
-                if response.startswith("```") and "\n" in response:
-                    first_line = response.split('\n')[0]
-                    language_tag = first_line.strip('`').strip()
-                    if language_tag:
-                        st.session_state.generated_file_name = f"generated_file.{language_tag}"
-                        st.session_state.generated_code_output = response.lstrip(first_line).rstrip('`').strip()
-                    else:
-                        st.session_state.generated_file_name = "generated_file.txt"
-                        st.session_state.generated_code_output = response.strip("```\n").strip("```")
-                else:
-                    st.session_state.generated_file_name = "generated_file.txt"
-                    st.session_state.generated_code_output = response
+            # write_stream renders tokens as they arrive and returns the
+            # accumulated string once the stream is exhausted.
+            with st.chat_message("assistant"):
+                response = st.write_stream(stream_code_request(user_query, uploaded_content=uploaded_code_content, uploaded_file_extension=uploaded_file_extension))
+            streamed_this_run = True
+            st.session_state.code_chat_history.append({"role": "user", "content": user_query})
+            if uploaded_code_content:
+                st.session_state.code_chat_history.append({"role": "code_upload", "content": uploaded_code_content})
+            st.session_state.code_chat_history.append({"role": "agent", "content": response})
+
+            fence_match = _CODE_FENCE_RE.match(response)
+            if fence_match:
+                language_tag = fence_match.group(1).strip()
+                st.session_state.generated_file_name = f"generated_file.{language_tag or 'txt'}"
+                st.session_state.generated_code_output = fence_match.group(2)
+            else:
+                st.session_state.generated_file_name = "generated_file.txt"
+                st.session_state.generated_code_output = response
         else:
             st.warning("Please enter an instruction for the Code Agent.")
 
@@ -124,16 +189,13 @@ if page_selection == "🤖 Code Agent":
 
     st.markdown("---")
     st.subheader("Code Agent Chat History")
-    for message in st.session_state.code_chat_history:
-        if message["role"] == "user":
-            st.markdown(f"**You:** {message['content']}")
-        elif message["role"] == "code_upload":
-            st.markdown(f"**Uploaded Content:**\n```\n{message['content']}\n```")
-        elif message["role"] == "agent":
-            st.markdown(f"**Agent:** {message['content']}")
+    _render_chat_history(st.session_state.code_chat_history, skip_last=1 if streamed_this_run else 0)
 
 
-elif page_selection == "📧 Email Agent":
+@st.fragment
+def _email_agent_fragment():
+    from Agents.email_agent import stream_email_request
+
     st.header("Email Agent 📧")
     st.markdown("Manage your emails: list unread messages or summarize specific emails.")
     st.info("Requires IMAP credentials to be set in the `.env` file.")
@@ -143,25 +205,26 @@ elif page_selection == "📧 Email Agent":
         key="email_agent_query"
     )
 
+    streamed_this_run = False
     if st.button("Run Email Agent", key="run_email_agent_btn"):
         if email_query:
-            with st.spinner("Email Agent is processing..."):
-                response = process_email_request(email_query)
-                st.session_state.email_chat_history.append({"role": "user", "content": email_query})
-                st.session_state.email_chat_history.append({"role": "agent", "content": response})
+            with st.chat_message("assistant"):
+                response = st.write_stream(stream_email_request(email_query))
+            streamed_this_run = True
+            st.session_state.email_chat_history.append({"role": "user", "content": email_query})
+            st.session_state.email_chat_history.append({"role": "agent", "content": response})
         else:
             st.warning("Please enter an instruction for the Email Agent.")
 
     st.markdown("---")
     st.subheader("Email Agent Chat History")
-    for message in st.session_state.email_chat_history:
-        if message["role"] == "user":
-            st.markdown(f"**You:** {message['content']}")
-        elif message["role"] == "agent":
-            st.markdown(f"**Agent:** {message['content']}")
+    _render_chat_history(st.session_state.email_chat_history, skip_last=1 if streamed_this_run else 0)
+
 
+@st.fragment
+def _blog_agent_fragment():
+    from Agents.blog_writer import stream_blog_request
 
-elif page_selection == "📎 Blog Agent":
     st.header("Blog Writer Agent 📎")
     st.markdown("Write and publish blog posts, or retrieve recent posts.")
 
@@ -178,31 +241,33 @@ elif page_selection == "📎 Blog Agent":
 
     blog_query = f"Title: {blog_title_input} Instructions: {blog_instruction_input}" if blog_title_input else ""
 
+    streamed_this_run = False
     if st.button("Run Blog Agent", key="blog_agent_query_btn"):
         if blog_query:
-            with st.spinner("Blog Agent is working..."):
-                response = process_blog_request(blog_query)
-                st.session_state.blog_chat_history.append({"role": "user", "content": blog_query})
-                st.session_state.blog_chat_history.append({"role": "agent", "content": response})
+            with st.chat_message("assistant"):
+                response = st.write_stream(stream_blog_request(blog_query))
+            streamed_this_run = True
+            st.session_state.blog_chat_history.append({"role": "user", "content": blog_query})
+            st.session_state.blog_chat_history.append({"role": "agent", "content": response})
+            # Stored at write time so rendering doesn't re-derive it from the
+            # history list on every rerun.
+            st.session_state.latest_blog = response
         else:
             st.warning("Please enter an instruction for the Blog Agent.")
-    
-    latest_blog_markdown = st.session_state.blog_chat_history[-1]['content'] if st.session_state.blog_chat_history else "No blog content available."
 
     st.markdown("---")
     st.subheader("Current Blog")
-    st.markdown(latest_blog_markdown if latest_blog_markdown else "No blog generated yet.")
+    st.markdown(st.session_state.latest_blog or "No blog generated yet.")
     st.markdown("---")
 
-    # st.subheader("Blog Agent Chat History")
-    # for message in st.session_state.email_chat_history:
-    #     if message["role"] == "user":
-    #         st.markdown(f"**You:** {message['content']}")
-    #     elif message["role"] == "agent":
-    #         st.markdown(f"**Agent:** {message['content']}")
+    st.subheader("Blog Agent Chat History")
+    _render_chat_history(st.session_state.blog_chat_history, skip_last=1 if streamed_this_run else 0)
 
 
-elif page_selection == "📚 RAG Agent": # New RAG Agent Tab
+@st.fragment
+def _rag_agent_fragment():
+    from Agents.rag_agent import load_and_process_document, stream_rag_request
+
     st.header("RAG Agent 📚")
     st.markdown("Upload a document (PDF, DOCX, TXT) and ask questions based on its content.")
     st.info("Requires Ollama 'nomic-embed-text' and a chat model (e.g., 'qwen3:8B') to be pulled locally.")
@@ -217,9 +282,17 @@ elif page_selection == "📚 RAG Agent": # New RAG Agent Tab
         if uploaded_rag_file is not None:
             with st.spinner(f"Processing '{uploaded_rag_file.name}'... This may take a moment."):
                 try:
-                    file_bytes = uploaded_rag_file.read()
                     file_type = uploaded_rag_file.name.split('.')[-1]
-                    st.session_state.rag_document_chunks = load_and_process_document(file_bytes, file_type)
+                    # Hash through a fixed-size buffer and hand the upload
+                    # buffer straight to the parser; the file is never
+                    # duplicated as a standalone bytes object.
+                    uploaded_rag_file.seek(0)
+                    file_hash = hashlib.file_digest(uploaded_rag_file, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+                    uploaded_rag_file.seek(0)
+                    store = _chunk_store()
+                    if file_hash not in store:
+                        store[file_hash] = load_and_process_document(uploaded_rag_file, file_type)
+                    st.session_state.rag_doc_hash = file_hash
                     st.session_state.rag_is_document_loaded = True
                     st.session_state.rag_uploaded_file_name = uploaded_rag_file.name
                     st.session_state.rag_chat_history.append({"role": "system", "content": f"Document '{uploaded_rag_file.name}' processed successfully. You can now ask questions."})
@@ -227,10 +300,11 @@ elif page_selection == "📚 RAG Agent": # New RAG Agent Tab
                 except Exception as e:
                     st.error(f"Error processing document: {e}")
                     st.session_state.rag_is_document_loaded = False
-                    st.session_state.rag_document_chunks = None
+                    st.session_state.rag_doc_hash = None
         else:
             st.warning("Please upload a document first.")
 
+    streamed_this_run = False
     if st.session_state.rag_is_document_loaded:
         st.markdown(f"---")
         st.subheader(f"Ask Questions about: {st.session_state.rag_uploaded_file_name}")
@@ -238,13 +312,14 @@ elif page_selection == "📚 RAG Agent": # New RAG Agent Tab
 
         if st.button("Ask RAG Agent", key="run_rag_agent_btn"):
             if rag_question:
-                with st.spinner("RAG Agent is thinking..."):
-                    try:
-                        response = process_rag_request(rag_question, st.session_state.rag_document_chunks)
-                        st.session_state.rag_chat_history.append({"role": "user", "content": rag_question})
-                        st.session_state.rag_chat_history.append({"role": "agent", "content": response})
-                    except Exception as e:
-                        st.error(f"Error asking question: {e}")
+                try:
+                    with st.chat_message("assistant"):
+                        response = st.write_stream(stream_rag_request(rag_question, _chunk_store().get(st.session_state.rag_doc_hash)))
+                    streamed_this_run = True
+                    st.session_state.rag_chat_history.append({"role": "user", "content": rag_question})
+                    st.session_state.rag_chat_history.append({"role": "agent", "content": response})
+                except Exception as e:
+                    st.error(f"Error asking question: {e}")
             else:
                 st.warning("Please enter a question.")
     else:
@@ -252,16 +327,19 @@ elif page_selection == "📚 RAG Agent": # New RAG Agent Tab
 
     st.markdown("---")
     st.subheader("RAG Agent Chat History")
-    for message in st.session_state.rag_chat_history:
-        if message["role"] == "user":
-            st.markdown(f"**You:** {message['content']}")
-        elif message["role"] == "agent":
-            st.markdown(f"**Agent:** {message['content']}")
-        elif message["role"] == "system":
-            st.info(message['content'])
+    _render_chat_history(st.session_state.rag_chat_history, skip_last=1 if streamed_this_run else 0)
+
 
+@st.cache_data(show_spinner=False)
+def _env_keys_frame(keys: tuple):
+    # One dataframe payload instead of a widget per entry; memoized on the
+    # key tuple so unrelated reruns skip rebuilding it. Values are kept out
+    # of the listing on purpose — .env entries are credentials.
+    import pandas as pd
+    return pd.DataFrame({"Key": list(keys)})
 
-elif page_selection == "⚙️ Environment Variables":
+
+def _env_page():
     st.header("Environment Variables (.env) Management 🛠️")
     st.warning("🚨 **Caution:** Changes to environment variables require restarting the Streamlit application to take effect in the agents.")
     st.markdown("---")
@@ -272,10 +350,9 @@ elif page_selection == "⚙️ Environment Variables":
 
     if st.button("Save/Update Entry", key="save_env_entry_btn"):
         if new_key:
-            env_path = find_dotenv()
-            if not env_path:
-                open('.env', 'a').close()
-                env_path = find_dotenv()
+            env_path = _env_path()
+            if not os.path.exists(env_path):
+                open(env_path, 'a').close()
             set_key(env_path, new_key, new_value)
             load_env_file()
             st.success(f"Entry '{new_key}' saved/updated. Restart app to apply changes.")
@@ -285,8 +362,7 @@ elif page_selection == "⚙️ Environment Variables":
 
     st.subheader("Current `.env` Entries")
     if st.session_state.env_vars:
-        for key, _ in st.session_state.env_vars.items():
-            st.markdown(f"- {key}")
+        st.dataframe(_env_keys_frame(tuple(st.session_state.env_vars)), hide_index=True, use_container_width=True)
     else:
         st.info("No entries found in .env file or file does not exist.")
 
@@ -298,8 +374,8 @@ elif page_selection == "⚙️ Environment Variables":
 
         if st.button("Remove Selected Entry", key="remove_env_entry_btn"):
             if selected_key_to_remove:
-                env_path = find_dotenv()
-                if env_path:
+                env_path = _env_path()
+                if os.path.exists(env_path):
                     unset_key(env_path, selected_key_to_remove)
                     load_env_file()
                     st.success(f"Entry '{selected_key_to_remove}' removed. Restart app to apply changes.")
@@ -309,3 +385,16 @@ elif page_selection == "⚙️ Environment Variables":
                 st.warning("Please select a key to remove.")
     else:
         st.info("No entries to remove.")
+
+
+# Label -> render-callable dispatch table: one dict lookup per rerun instead
+# of walking an if/elif chain of string comparisons.
+_PAGES = {
+    "🤖 Code Agent": _code_agent_fragment,
+    "📧 Email Agent": _email_agent_fragment,
+    "📎 Blog Agent": _blog_agent_fragment,
+    "📚 RAG Agent": _rag_agent_fragment,
+    "⚙️ Environment Variables": _env_page,
+}
+
+_PAGES[page_selection]()